@@ -86,7 +86,9 @@ SINGLE_VALUE_PROB = 0.2
 SINGLE_ENTITY_PROB = 0.05
 RECURSION_LIMIT = 3 #FilterQuery - how long filter query will be generated
 
-# probabilities for generating operators in the $filter query option (FilterQuery - entities.py)
+# probabilities for generating operators in the $filter query option (FilterQuery - entities.py);
+# LOGICAL_OPERATORS and EXPRESSION_OPERATORS only hold the initial distribution - the values are
+# reweighted at runtime by OperatorWeights (fuzzer.py) based on which operators trigger HTTP 500
 LOGICAL_OPERATORS = {'and': 0.5, 'or': 0.5}
 BOOLEAN_OPERATORS = {'eq': 0.5, 'ne': 0.5}
 INTERVAL_OPERATORS = {'le': 0.5, 'ge': 0.5}
@@ -102,6 +104,13 @@ FUZZY_SEARCH_OR_PROB = 0.2
 FUZZY_SEARCH_EQUAL_PROB = 0.2
 MAX_FUZZY_SEARCH_ORS = 3
 
+# adaptive reweighting of the $filter operators (OperatorWeights - fuzzer.py); the exponential
+# moving average keeps most of the old weight, and the floor prevents starving any operator
+OPERATOR_EMA_OLD_WEIGHT = 0.62
+OPERATOR_EMA_NEW_WEIGHT = 0.38
+OPERATOR_WEIGHT_FLOOR = 0.02
+OPERATOR_REWEIGHT_HITS = 32
+
 FILTER_CROSS_PROBABILITY = 0.8
 KEY_VALUES_MUTATION_PROB = 0.05
 ASSOCIATED_ENTITY_PROB = 0.5
@@ -111,6 +120,14 @@ ASSOCIATED_ENTITY_PROB = 0.5
 STRING_THRESHOLD = 200
 ITERATIONS_THRESHOLD = 30
 CONTENT_LEN_SIZE = 50000
+# converging populations contain many duplicate individuals, so the fitness function is memoized;
+# the cache is dropped whenever the score starts to stagnate (Selector)
+FITNESS_CACHE_SIZE = 100000
+# fraction of offsprings that pay for the database-backed predecessor comparison in
+# Analyzer; queries that triggered HTTP 500 are always compared in full
+ANALYSIS_SAMPLE_RATE = 0.2
+# resolution of the response time used as a part of the memoization key (2 buckets per second)
+ELAPSED_BUCKETS_PER_SECOND = 2
 
 FILTER_PARTS_NUM = 2
 ORDERBY_MAX_PROPS = 3
@@ -119,12 +136,21 @@ INT_MAX = 2147483647
 
 SCORE_EPS = 200
 ELITE_PROB = 0.7
+# offsprings whose ancestry accumulated this many mutations in a row are crossed
+# without an additional mutation, so the population does not drift into noise
+MAX_CONSECUTIVE_MUTATIONS = 5
 FILTER_DEL_PROB = 0.1
 ORDERBY_DEL_PROB = 0.1
 OPTION_DEL_PROB = 0.1
 MAX_MULTI_VALUES = 3
 MAX_EXPAND_VALUES = 3
 FILTER_SAMPLE_SIZE = 30
+# number of uniformly sampled entity sets out of which Selector picks the least
+# fuzzed one, so well-covered sets do not keep receiving an equal share forever
+SELECTION_CANDIDATES_NUM = 4
+# how many dispatched batches the seeding pipeline may keep in flight while the
+# main loop analyzes and saves the finished ones (Fuzzer.seed_population)
+SEED_PIPELINE_DEPTH = 4
 MAX_BEST_QUERIES = 30
 INLINECOUNT_ALL_PAGES_PROB = 0.5
 
@@ -144,6 +170,10 @@ BASE_CHARSET = 'abcdefghijklmnopqrstuvxyzABCDEFGHIJKLMNOPQRSTUVXYZ0123456789~!$@
                '[]|:<>.‰¨œƒ…†‡Œ‘’´`“”•™¡¢£¤¥¦§©ª«¬®¯°±²³µ¶·¸¹º»¼½¾¿ÀÁÂÃÄÅÆÇÈÉÊËÌÍ' \
                'ÎÏÐÑÒÓÔÕÖ×ØÙÚÛÜÝÞßàáâãäåæçèéêëìíîïðñòóôõö÷øùúûüýþÿ{} '
 
+# pre-decoded variant for the random generators and mutators; indexing a tuple of
+# single-character strings is cheaper than indexing the non-ASCII str over and over
+BASE_CHARSET_TUPLE = tuple(BASE_CHARSET)
+
 NON_EXISTING_MULTIPLICITY = '-1'
 
 # namespaces required for parsing error messages from responses (this was tested on within SAP applications) (fuzzer.py)
@@ -4,7 +4,7 @@ import random
 import uuid
 
 from abc import ABCMeta, abstractmethod
-from pymongo import errors, MongoClient, ASCENDING, DESCENDING
+from pymongo import errors, MongoClient, ReplaceOne, ASCENDING, DESCENDING
 
 from odfuzz.constants import MONGODB_NAME, FILTER_PARTS_NUM, FILTER_SAMPLE_SIZE, MAX_BEST_QUERIES
 
@@ -27,7 +27,11 @@ class DatabaseOperationsHandler:
     @abstractmethod
     def save_entry(self, data):
         pass
-    
+
+    @abstractmethod
+    def save_entries(self, entries):
+        pass
+
     @abstractmethod
     def find_entry(self, id):
         pass
@@ -76,48 +80,108 @@ class MongoDB:
 class MongoDBHandler(DatabaseOperationsHandler):
     def __init__(self, mongodb_client):
         self._collection = mongodb_client.collection
-    
+        self._create_indexes()
+        # the total score and the number of entries are maintained incrementally so that
+        # the stagnation check does not aggregate the whole collection over and over;
+        # the counters are seeded lazily from one aggregation on the first read
+        self._score_sum = 0
+        self._entries_count = 0
+        self._counters_stale = True
+
+    def _create_indexes(self):
+        # every hot path ($match in sample_filter_entry, find_best_entries and
+        # find_distinct_errorous_entity_names, sort in delete_worst_entries) filters on
+        # these keys; without the indexes each evolve iteration scans the whole collection
+        self._collection.create_index(
+            [('entity_set', ASCENDING), ('http', ASCENDING), ('score', DESCENDING)], background=True)
+        self._collection.create_index('score', background=True)
+
     def save_entry(self, data):
-        if self._collection.find(data).count() == 0:
+        # a point lookup on the unique _id replaces the old whole-document cursor
+        # count, so the existence check is answered straight from the _id index
+        if self._collection.find_one({'_id': data['_id']}, {'_id': 1}) is None:
             self._collection.insert_one(data)
-    
+            self._entries_count += 1
+            self._score_sum += data['score'] or 0
+
+    def save_entries(self, entries):
+        # a single bulk_write round-trip instead of one insert per entry; upserting
+        # by _id keeps the operation idempotent for entries that were saved already
+        operations = [ReplaceOne({'_id': entry['_id']}, entry, upsert=True) for entry in entries]
+        if not operations:
+            return
+        result = self._collection.bulk_write(operations, ordered=False)
+        if result.matched_count:
+            # an existing entry was replaced and its previous score is unknown
+            self._counters_stale = True
+        else:
+            self._entries_count += result.upserted_count
+            self._score_sum += sum(entry['score'] or 0 for entry in entries)
+
     def find_entry(self, id):
-        queries = list(self._collection.find({'_id': id}))
-        return next(iter(queries), None)
-    
+        return self._collection.find_one({'_id': id})
+
     def delete_entry(self, id):
-        result = self._collection.delete_one({'_id': id})
-        return result.deleted_count
-    
+        deleted_entry = self._collection.find_one_and_delete({'_id': id})
+        if deleted_entry is None:
+            return 0
+        self._entries_count -= 1
+        self._score_sum -= deleted_entry['score'] or 0
+        return 1
+
     def delete_worst_entries(self, number):
         if number > 0:
-            queries = self._collection.find().sort('score', ASCENDING).limit(number)
-
-            ids_to_remove = [query['_id'] for query in queries]
-            self._collection.delete_many({'_id': {'$in': ids_to_remove}})
+            # only _id and score are needed here; with the projection the sorted scan
+            # is answered from the score index instead of fetching whole documents
+            queries = self._collection.find(
+                {}, {'score': 1}).sort('score', ASCENDING).limit(number)
+
+            ids_to_remove = []
+            for query in queries:
+                ids_to_remove.append(query['_id'])
+                self._score_sum -= query['score'] or 0
+            result = self._collection.delete_many({'_id': {'$in': ids_to_remove}})
+            self._entries_count -= result.deleted_count
 
     def delete_collection(self):
         self._collection.drop()
+        # dropping a collection discards its indexes as well
+        self._create_indexes()
+        self._score_sum = 0
+        self._entries_count = 0
+        self._counters_stale = False
 
     def total_entries(self):
-        return self._collection.find().count()
-    
+        if self._counters_stale:
+            self._refresh_counters()
+        return self._entries_count
+
     def total_score(self):
-        scores = list(self._collection.aggregate([
-            {'$project': {'score': 1}},
-            {'$group': {'_id': None, 'overall': {'$sum': '$score'}}}
+        if self._counters_stale:
+            self._refresh_counters()
+        return self._score_sum
+
+    def _refresh_counters(self):
+        # queries are stored as flat documents, so a single $group over the whole
+        # collection yields both running totals at once
+        totals = list(self._collection.aggregate([
+            {'$group': {'_id': None, 'overall': {'$sum': '$score'}, 'count': {'$sum': 1}}}
         ]))
-        if  scores:
-            overall_score = scores[0]['overall']
+        if totals:
+            self._score_sum = totals[0]['overall']
+            self._entries_count = totals[0]['count']
         else:
-            overall_score = 0
-        return overall_score
-    
+            self._score_sum = 0
+            self._entries_count = 0
+        self._counters_stale = False
+
     def sample_filter_entry(self, entity_set_name, exclude_id):
+        # matching on the existence of the (FILTER_PARTS_NUM - 1)-th array element is
+        # equivalent to the former $expr $size comparison, but does not force Mongo
+        # to evaluate an expression on every document of the entity set
         queries = list(self._collection.aggregate([
             {'$match': {'entity_set': entity_set_name, '_id': {'$ne': exclude_id},
-                        '_$filter.parts': {'$exists': True},
-                        '$expr': {'$gte': [{'$size': '$_$filter.parts'}, FILTER_PARTS_NUM]}}},
+                        '_$filter.parts.{}'.format(FILTER_PARTS_NUM - 1): {'$exists': True}}},
             {'$sample': {'size': FILTER_SAMPLE_SIZE}},
             {'$sort': {'score': DESCENDING}}, {'$limit': 1}
         ]))
@@ -5,16 +5,18 @@ import io
 import sys
 import hashlib
 import logging
+import functools
 import gevent
 import requests
 import requests.adapters
 
 from copy import deepcopy
 from datetime import datetime
-from collections import namedtuple
+from collections import namedtuple, Counter
 from abc import ABCMeta, abstractmethod
 from lxml import etree
 from gevent.pool import Pool
+from gevent.queue import Queue
 from bson.objectid import ObjectId
 from pymongo.errors import ServerSelectionTimeoutError  #TODO leaky abstraction, should be new exception class in database.py, untied to specific database usage.
 
@@ -93,6 +95,9 @@ class Fuzzer:
         if asynchronous:
             self._queryable_factory = MultipleQueryable
             self._dispatch = self._get_multiple_responses
+            # the pool of greenlets is reused for all batches; constructing a new pool
+            # per dispatched batch only produces garbage
+            self._pool = Pool(Config.dispatcher.async_requests_num)
         else:
             self._queryable_factory = SingleQueryable
             self._dispatch = self._get_single_response
@@ -149,12 +154,38 @@ class Fuzzer:
                 entityset_urls_count = round(entityset_urls_count / Config.dispatcher.async_requests_num)
             self._logger.info('Population range for entity \'{}\' is set to {}'
                               .format(queryable.entity_set.name, entityset_urls_count))
-            for _ in range(entityset_urls_count):
-                q = self._queryable_factory(queryable, self._logger, Config.dispatcher.async_requests_num)
-                queries = q.generate()
-                self._send_queries(queries)
-                self._analyze_queries(queries)
-                self._save_queries(queries)
+            if self._asynchronous:
+                self._seed_queryable_pipelined(queryable, entityset_urls_count)
+            else:
+                for _ in range(entityset_urls_count):
+                    q = self._queryable_factory(queryable, self._logger, Config.dispatcher.async_requests_num)
+                    queries = self._generate_and_send_queries(q)
+                    self._analyze_and_save_queries(queries)
+
+    def _seed_queryable_pipelined(self, queryable, entityset_urls_count):
+        # a producer greenlet generates and dispatches the batches while the finished
+        # ones are analyzed and saved here, so the database work of one batch overlaps
+        # with the network wait of the next; the bounded queue caps the in-flight window
+        batches = Queue(SEED_PIPELINE_DEPTH)
+
+        def produce_batches():
+            # the sentinel must be enqueued even when the producer dies, otherwise
+            # the consuming loop below blocks on the queue forever and the original
+            # exception never surfaces through producer.get()
+            try:
+                for _ in range(entityset_urls_count):
+                    q = self._queryable_factory(queryable, self._logger, Config.dispatcher.async_requests_num)
+                    batches.put(self._generate_and_send_queries(q))
+            finally:
+                batches.put(None)
+
+        producer = gevent.spawn(produce_batches)
+        while True:
+            queries = batches.get()
+            if queries is None:
+                break
+            self._analyze_and_save_queries(queries)
+        producer.get()
 
     def evolve_population(self):
         """
@@ -174,8 +205,7 @@ class Fuzzer:
             else:
                 self._logger.info('Generating new queries...')
                 q = self._queryable_factory(selection.queryable, self._logger, Config.dispatcher.async_requests_num)
-                queries = q.generate()
-                self._send_queries(queries)
+                queries = self._generate_and_send_queries(q)
                 self._analyze_queries(queries)
                 self._slay_weakest_individuals(len(queries))
             self._save_queries(queries)
@@ -186,20 +216,56 @@ class Fuzzer:
         self._save_to_database(queries)
         self._output_handler.print_test_num()
 
+    def _analyze_and_save_queries(self, queries):
+        # one pass instead of two: each query is analyzed, logged and marshalled for
+        # the bulk save while its options and response objects are still hot; only
+        # usable where no weak individuals are slain between analysis and saving
+        dictionaries = []
+        for query in queries:
+            self._analyzer.analyze(query)
+            self._urls_logger.log_url(query)
+            self._stats_logger.log_query(query)
+            dictionaries.append(query.dictionary)
+        self._database.save_entries(dictionaries)
+        self._output_handler.print_test_num()
+
     def _send_queries(self, queries):
         while True:
             success = self._dispatch(queries)
             if success:
                 break
 
+    def _generate_and_send_queries(self, queryable):
+        if not self._asynchronous:
+            queries = queryable.generate()
+            self._send_queries(queries)
+            return queries
+
+        queries = []
+        greenlets = []
+        for _ in range(Config.dispatcher.async_requests_num):
+            query = queryable.generate_query()
+            queries.append(query)
+            greenlets.append(self._pool.spawn(self._get_response, query))
+            # yield to the hub so the request above is already on the wire while
+            # the next query is still being generated
+            gevent.sleep(0)
+        try:
+            gevent.joinall(greenlets, raise_error=True)
+        except DispatcherError:
+            self._pool.kill()
+            self._handle_dispatcher_exception()
+            # re-dispatch the very same batch until it succeeds
+            self._send_queries(queries)
+        return queries
+
     def _get_multiple_responses(self, queries):
-        pool = Pool(Config.dispatcher.async_requests_num)
         for query in queries:
-            pool.spawn(self._get_response, query)
+            self._pool.spawn(self._get_response, query)
         try:
-            pool.join(raise_error=True)
+            self._pool.join(raise_error=True)
         except DispatcherError:
-            pool.kill()
+            self._pool.kill()
             self._handle_dispatcher_exception()
             return False
         return True
@@ -243,8 +309,7 @@ class Fuzzer:
         self._database.delete_worst_entries(number_of_individuals)
 
     def _save_to_database(self, queries):
-        for query in queries:
-            self._database.save_entry(query.dictionary)
+        self._database.save_entries([query.dictionary for query in queries])
 
     def _set_error_attributes(self, query):
         self._set_attribute_value(query, 'error_code', 'error', 'code')
@@ -307,18 +372,25 @@ class Queryable:
         self._logger.info('Generated query \'{}\''.format(query.query_string))
 
     def _crossover_queries(self, query1, query2):
-        if is_filter_crossable(query1, query2):
-            replaceable_parts = [part for part in query1['_$filter']['parts'] if part.get('replaceable', True)]
+        # every offspring has to start from a pristine copy of the parent; without it,
+        # all children created within one batch would share the parent dictionary and
+        # stack their mutations on top of each other
+        crossed_query1 = deepcopy(query1)
+        if is_filter_crossable(crossed_query1, query2):
+            replaceable_parts = [part for part in crossed_query1['_$filter']['parts'] if part.get('replaceable', True)]
             if replaceable_parts:
-                offspring = self._crossover_filter(replaceable_parts, query1, query2)
+                offspring = self._crossover_filter(replaceable_parts, crossed_query1, query2)
             else:
-                offspring = self._crossover_options(query1, query2)
+                offspring = self._crossover_options(crossed_query1, query2)
         else:
-            offspring = self._crossover_options(query1, query2)
+            offspring = self._crossover_options(crossed_query1, query2)
         Stats.created_by_crossover += 1
 
         query = self.build_offspring(deepcopy(offspring))
-        self._mutate_query(query)
+        mutations_num = max(query1.get('mutations', 0), query2.get('mutations', 0))
+        if mutations_num < MAX_CONSECUTIVE_MUTATIONS:
+            self._mutate_query(query)
+            query.mutations_num = mutations_num + 1
         query.add_predecessor(query1['_id'])
         query.add_predecessor(query2['_id'])
         query.build_string()
@@ -548,7 +620,10 @@ class URLsLogger:
 
     def log_ursl(self, queries):
         for query in queries:
-            self._urls_logger.info(query.url_hash + ':' + query.query_string)
+            self.log_url(query)
+
+    def log_url(self, query):
+        self._urls_logger.info(query.url_hash + ':' + query.query_string)
 
 
 class StatsLogger:
@@ -563,15 +638,18 @@ class StatsLogger:
         self._filter_logger.info(CSV_FILTER)
 
     def log_stats(self, queries):
-        self.log_overall(queries)
-        self.log_filter(queries)
-
-    def log_overall(self, queries):
         for query in queries:
-            query_dict = query.dictionary
-            query_proprties = self._get_proprties(query_dict)
-            for proprty in query_proprties:
-                self._log_formatted_stats(query, query_dict, proprty)
+            self.log_query(query)
+
+    def log_query(self, query):
+        self.log_overall(query)
+        self.log_filter(query)
+
+    def log_overall(self, query):
+        query_dict = query.dictionary
+        query_proprties = self._get_proprties(query_dict)
+        for proprty in query_proprties:
+            self._log_formatted_stats(query, query_dict, proprty)
 
     def _log_formatted_stats(self, query, query_dict, proprty):
         self._stats_logger.info(
@@ -619,19 +697,18 @@ class StatsLogger:
                 proprties.update([part['name']])
         return proprties
 
-    def log_filter(self, queries):
-        for query in queries:
-            filter_option = query.dictionary.get('_$filter')
-            if filter_option:
-                logical_names = {logical['name'] for logical in filter_option['logicals']}
-                if 'and' in logical_names and 'or' in logical_names:
-                    logical = 'combination'
+    def log_filter(self, query):
+        filter_option = query.dictionary.get('_$filter')
+        if filter_option:
+            logical_names = {logical['name'] for logical in filter_option['logicals']}
+            if 'and' in logical_names and 'or' in logical_names:
+                logical = 'combination'
+            else:
+                if filter_option['logicals']:
+                    logical = filter_option['logicals'][0]['name']
                 else:
-                    if filter_option['logicals']:
-                        logical = filter_option['logicals'][0]['name']
-                    else:
-                        logical = ''
-                self._log_filter_parts(filter_option, query, logical)
+                    logical = ''
+            self._log_filter_parts(filter_option, query, logical)
 
     def _log_filter_parts(self, filter_option, query, logical_name):
         for part in filter_option['parts']:
@@ -745,6 +822,10 @@ class Selector:
         self._score_average = 0
         self._passed_iterations = 0
         self._entities = entities
+        # the set of queryable entities is fixed once Builder has run, so the list
+        # is materialized here instead of on every single selection
+        self._queryable_entities = list(entities.all())
+        self._selection_counts = Counter()
 
     @property
     def score_average(self):
@@ -756,7 +837,7 @@ class Selector:
 
     def select(self):
         if self._is_score_stagnating():
-            selection = Selection(None, random.choice(list(self._entities.all())))
+            selection = Selection(None, self._least_fuzzed_queryable())
         else:
             selection = self._crossable_selection()
         self._passed_iterations += 1
@@ -764,11 +845,21 @@ class Selector:
         return selection
 
     def _crossable_selection(self):
-        queryable = random.choice(list(self._entities.all()))
+        queryable = self._least_fuzzed_queryable()
         crossable = self._get_crossable(queryable)
         selection = Selection(crossable, queryable)
         return selection
 
+    def _least_fuzzed_queryable(self):
+        # out of a few uniformly sampled candidates, prefer the entity set that was
+        # selected the least so far; this spreads the request budget over the whole
+        # schema instead of hammering already well-covered sets
+        candidates_num = min(SELECTION_CANDIDATES_NUM, len(self._queryable_entities))
+        candidates = random.sample(self._queryable_entities, candidates_num)
+        queryable = min(candidates, key=lambda candidate: self._selection_counts[candidate.entity_set.name])
+        self._selection_counts[queryable.entity_set.name] += 1
+        return queryable
+
     def _is_score_stagnating(self):
         if self._passed_iterations > ITERATIONS_THRESHOLD:
             self._passed_iterations = 0
@@ -776,6 +867,11 @@ class Selector:
             old_average = self._score_average
             self._score_average = current_average
             if (current_average - old_average) < SCORE_EPS:
+                cache_info = FitnessEvaluator.cache_info()
+                self._logger.info('Resetting fitness cache ({} hits, {} misses)'
+                                  .format(cache_info.hits, cache_info.misses))
+                FitnessEvaluator.reset_cache()
+                self._selection_counts.clear()
                 return True
         return False
 
@@ -806,6 +902,46 @@ class Selection:
         return self._queryable
 
 
+class OperatorWeights:
+    """Adaptive weights for one group of $filter operators.
+
+    The dictionaries from constants.py are shared with the query generators, so updating
+    the values in place changes which operators are generated from that moment on.
+    Operators appearing in queries that triggered HTTP 500 are credited; once enough
+    credits are collected, the weights move towards the observed hit distribution by an
+    exponential moving average. A weight floor makes sure no operator is starved forever.
+    """
+
+    def __init__(self, weights):
+        self._weights = weights
+        self._hits = dict.fromkeys(weights, 0)
+        self._credited = 0
+
+    def credit(self, operators):
+        for operator in operators:
+            if operator in self._hits:
+                self._hits[operator] += 1
+                self._credited += 1
+        if self._credited >= OPERATOR_REWEIGHT_HITS:
+            self._reweight()
+
+    def _reweight(self):
+        for operator, weight in self._weights.items():
+            hit_rate = self._hits[operator] / self._credited
+            self._weights[operator] = OPERATOR_EMA_OLD_WEIGHT * weight + OPERATOR_EMA_NEW_WEIGHT * hit_rate
+        self._apply_floor_and_normalize()
+        self._hits = dict.fromkeys(self._hits, 0)
+        self._credited = 0
+
+    def _apply_floor_and_normalize(self):
+        total = sum(self._weights.values())
+        for operator, weight in self._weights.items():
+            self._weights[operator] = max(weight / total, OPERATOR_WEIGHT_FLOOR)
+        total = sum(self._weights.values())
+        for operator, weight in self._weights.items():
+            self._weights[operator] = weight / total
+
+
 class Analyzer:
     """Fitness function evaluator for analyzing responses from generated queries.
 
@@ -815,18 +951,28 @@ class Analyzer:
     def __init__(self, database):
         self._database = database
         self._population_score = 0
+        self._logical_weights = OperatorWeights(LOGICAL_OPERATORS)
+        self._expression_weights = OperatorWeights(EXPRESSION_OPERATORS)
 
     def analyze(self, query):
         new_score = FitnessEvaluator.evaluate(query)
         query.score = new_score
         self._update_population_score(new_score)
+        if query.response.status_code == 500:
+            self._credit_operators(query)
         predecessors_ids = query.dictionary['predecessors']
-        if predecessors_ids:
+        if predecessors_ids and self._is_analyzed_in_full(query):
             offspring = self._build_offspring_by_score(predecessors_ids, query, new_score)
         else:
             offspring = EmptyOffspring(self._database)
         return offspring
 
+    def _is_analyzed_in_full(self, query):
+        # sampling the predecessor comparison cuts the per-offspring database lookups
+        # without materially hurting selection; error-triggering queries always feed
+        # the selection with a full comparison
+        return query.response.status_code == 500 or random.random() < ANALYSIS_SAMPLE_RATE
+
     def _build_offspring_by_score(self, predecessors_id, query, new_score):
         for predecessor_id in predecessors_id:
             if self._database.find_entry(predecessor_id)['score'] < new_score:
@@ -839,6 +985,14 @@ class Analyzer:
         else:
             self._population_score += query_score
 
+    def _credit_operators(self, query):
+        filter_option = query.dictionary.get('_$filter')
+        if not filter_option:
+            return
+        self._logical_weights.credit(logical['name'] for logical in filter_option['logicals'])
+        self._expression_weights.credit(
+            part['operator'] for part in filter_option['parts'] if 'operator' in part)
+
 
 class Offspring(metaclass=ABCMeta):
     """
@@ -898,19 +1052,40 @@ class FitnessEvaluator:
 
     It is preffering shorther URLs for HTTP 500 responses and ignores other HTTP status codes.
     It preffers URLs where smaller response content took significantly longer time (i.e. empiric observation of server handling bad requests).
+
+    Converging populations contain a lot of duplicate individuals, therefore the heuristics
+    are memoized on primitive values extracted from the query and its response. The response
+    time is bucketed so that near-duplicates share a cache entry as well. Selector drops the
+    cache whenever the overall score starts to stagnate.
     """
 
     @staticmethod
     def evaluate(query):
+        content_length = query.response.headers.get('content-length')
+        elapsed_bucket = int(query.response.elapsed.total_seconds() * ELAPSED_BUCKETS_PER_SECOND)
+        query_len = len(query.query_string) - len(query.entity_name) - query.options_keys_len
+        return FitnessEvaluator._evaluate_cached(
+            query_len, query.response.status_code, query.response.error_code,
+            query.response.error_message, int(content_length) if content_length else None,
+            elapsed_bucket)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=FITNESS_CACHE_SIZE)
+    def _evaluate_cached(query_len, status_code, error_code, error_message, content_length, elapsed_bucket):
         total_score = 0
-        keys_len = sum(len(option_name) for option_name in query.options.keys())
-        query_len = len(query.query_string) - len(query.entity_name) - keys_len
         total_score += FitnessEvaluator.eval_string_length(query_len)
-        total_score += FitnessEvaluator.eval_http_status_code(
-            query.response.status_code, query.response.error_code, query.response.error_message)
-        total_score += FitnessEvaluator.eval_http_response_time(query.response)
+        total_score += FitnessEvaluator.eval_http_status_code(status_code, error_code, error_message)
+        total_score += FitnessEvaluator.eval_http_response_time(content_length, elapsed_bucket)
         return total_score
 
+    @staticmethod
+    def cache_info():
+        return FitnessEvaluator._evaluate_cached.cache_info()
+
+    @staticmethod
+    def reset_cache():
+        FitnessEvaluator._evaluate_cached.cache_clear()
+
     @staticmethod
     def eval_http_status_code(status_code, error_code, error_message):
         if status_code == 500:
@@ -921,12 +1096,12 @@ class FitnessEvaluator:
             return -50
 
     @staticmethod
-    def eval_http_response_time(response):
-        if not response.headers.get('content-length'):
+    def eval_http_response_time(content_length, elapsed_bucket):
+        if not content_length:
             return 0
-        if int(response.headers['content-length']) > CONTENT_LEN_SIZE:
+        if content_length > CONTENT_LEN_SIZE:
             return -10
-        total_seconds = response.elapsed.total_seconds()
+        total_seconds = elapsed_bucket / ELAPSED_BUCKETS_PER_SECOND
         score = total_seconds / 10
         if total_seconds < 100:
             score += (total_seconds ** 2) / (10 ** (len(str(total_seconds)) + 1))
@@ -967,6 +1142,7 @@ class Query:
     def __init__(self, accessible_entity):
         self._accessible_entity = accessible_entity
         self._options = {}
+        self._options_keys_len = 0
         self._query_string = ''
         self._dict = None
         self._score = None
@@ -974,7 +1150,8 @@ class Query:
         self._order = []
         self._response = None
         self._parts = 0
-        self._id = ObjectId()
+        self._mutations_num = 0
+        self._id = IdGenerator.generate()
         self._options_strings = {'$orderby': '', '$filter': '', '$skip': '', '$top': '', '$expand': '',
                                  'search': '', '$inlinecount': ''}
         self._url_hash = ''
@@ -987,6 +1164,10 @@ class Query:
     def options(self):
         return self._options
 
+    @property
+    def options_keys_len(self):
+        return self._options_keys_len
+
     @property
     def query_string(self):
         return self._query_string
@@ -1028,6 +1209,14 @@ class Query:
     def url_hash(self):
         return self._url_hash
 
+    @property
+    def mutations_num(self):
+        return self._mutations_num
+
+    @mutations_num.setter
+    def mutations_num(self, value):
+        self._mutations_num = value
+
     @query_string.setter
     def query_string(self, value):
         self._query_string = value
@@ -1048,6 +1237,10 @@ class Query:
         return not (name == FILTER and self._accessible_entity.entity_set.requires_filter)
 
     def add_option(self, name, option):
+        # deleted options keep their key in the dictionary, so the running length
+        # only grows when a name appears for the first time
+        if name not in self._options:
+            self._options_keys_len += len(name)
         self._options[name] = option
         self._order.append('_' + name)
 
@@ -1099,6 +1292,7 @@ class Query:
             'predecessors': self._predecessors,
             'string': self._query_string,
             'score': self._score,
+            'mutations': self._mutations_num,
             'order': self._order,
             '_$orderby': self._options.get(ORDERBY),
             '_$top': self._options.get(TOP),
@@ -1122,6 +1316,31 @@ class HashGenerator:
         return hashlib.md5(string.encode('utf-8')).hexdigest()
 
 
+class IdGenerator:
+    """A generator of random ObjectIds for queries.
+
+    The entropy for many ids is drawn by a single os.urandom read and sliced up on demand,
+    which is considerably cheaper than one system call per generated query. The ids are
+    only used as unique database keys, so the timestamp prefix of a regular ObjectId is
+    not required.
+    """
+
+    BUFFERED_IDS_NUM = 256
+    ID_LENGTH = 12
+
+    _buffer = b''
+    _offset = 0
+
+    @classmethod
+    def generate(cls):
+        if cls._offset >= len(cls._buffer):
+            cls._buffer = os.urandom(cls.ID_LENGTH * cls.BUFFERED_IDS_NUM)
+            cls._offset = 0
+        object_id = ObjectId(cls._buffer[cls._offset:cls._offset + cls.ID_LENGTH])
+        cls._offset += cls.ID_LENGTH
+        return object_id
+
+
 class Dispatcher:
     """A dispatcher for sending HTTP requests to the particular OData service."""
 
@@ -1131,12 +1350,17 @@ class Dispatcher:
         self._logger = logging.getLogger(FUZZER_LOGGER)
         self._service = arguments.service.rstrip('/') + '/'
 
+        # one session lives for the whole fuzzing run so that the underlying connection
+        # pool is reused across all requests (keep-alive) instead of re-handshaking
         self._session = requests.Session()
         adapter = requests.adapters.HTTPAdapter(pool_connections=self._config.async_requests_num,
                                                 pool_maxsize=self._config.async_requests_num)
-        self._session.mount(ACCESS_PROTOCOL, adapter)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
         self._session.verify = self._get_sap_certificate()
-        self._session.headers.update({'user-agent': 'odfuzz/1.0'})
+        self._session.headers.update({'user-agent': 'odfuzz/1.0',
+                                      'accept-encoding': 'gzip, deflate',
+                                      'connection': 'keep-alive'})
 
         self._init_auth_credentials(arguments.credentials)
 
@@ -1236,15 +1460,14 @@ def replace_part_characters(data, key):
         data[key] = replace_special_characters(data[key])
 
 
+# compiled once; a single translate pass replaces the former chain of seven
+# str.replace calls that rebuilt every option string over and over
+SPECIAL_CHARACTERS_TABLE = str.maketrans({
+    '%': '%25', '&': '%26', '#': '%23', '?': '%3F', '+': '%2B', '/': '%2F', '\'': '\'\''})
+
+
 def replace_special_characters(replacing_string):
-    replacing_string = replacing_string.replace('%', '%25')
-    replacing_string = replacing_string.replace('&', '%26')
-    replacing_string = replacing_string.replace('#', '%23')
-    replacing_string = replacing_string.replace('?', '%3F')
-    replacing_string = replacing_string.replace('+', '%2B')
-    replacing_string = replacing_string.replace('/', '%2F')
-    replacing_string = replacing_string.replace('\'', '\'\'')
-    return replacing_string
+    return replacing_string.translate(SPECIAL_CHARACTERS_TABLE)
 
 
 def build_xpath_format_string(*args):
@@ -4,7 +4,7 @@ import random
 import uuid
 import datetime
 
-from odfuzz.constants import BASE_CHARSET, HEX_BINARY
+from odfuzz.constants import BASE_CHARSET_TUPLE, HEX_BINARY
 
 START_DATE = datetime.datetime(1900, 1, 1, 0, 0, 0)
 END_DATE = datetime.datetime(9999, 12, 31, 23, 59, 59)
@@ -15,7 +15,7 @@ class EdmGenerator:
     @staticmethod
     def edm_binary():
         prefix = 'X' if random.random() < 0.5 else 'binary'
-        binary = ''.join([random.choice(HEX_BINARY) for _ in range(random.randrange(2, 20, 2))])
+        binary = ''.join(random.choices(HEX_BINARY, k=random.randrange(2, 20, 2)))
         return '{0}\'{1}\''.format(prefix, binary)
 
     @staticmethod
@@ -95,5 +95,6 @@ class RandomGenerator:
     @staticmethod
     def random_string(max_length):
         string_length = round(random.random() * max_length)
-        generated_string = ''.join(random.choice(BASE_CHARSET) for _ in range(string_length))
+        # one bulk choices call instead of one Python-level choice per character
+        generated_string = ''.join(random.choices(BASE_CHARSET_TUPLE, k=string_length))
         return generated_string
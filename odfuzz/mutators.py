@@ -3,7 +3,7 @@ import random
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-from odfuzz.constants import BASE_CHARSET, HEX_BINARY, INT_MAX
+from odfuzz.constants import BASE_CHARSET_TUPLE, HEX_BINARY, INT_MAX
 
 class StringMutator:
     _methods = []
@@ -77,7 +77,7 @@ class StringMutator:
     def add_char(self, string):
         string = string[1:-1]
         index = round(random.random() * (len(string)))
-        new_char = random.choice(BASE_CHARSET)
+        new_char = random.choice(BASE_CHARSET_TUPLE)
         generated_string = ''.join([string[:index], new_char, string[index:]])
         if self.max_length < len(generated_string):
             generated_string = generated_string[:-1]
@@ -1,4 +1,5 @@
 from sys import stdout
+from time import monotonic
 from abc import ABCMeta, abstractmethod
 
 from odfuzz.statistics import Stats
@@ -18,10 +19,22 @@ class OutputHandler(metaclass=ABCMeta):
 
 
 class StandardOutput(OutputHandler):
+    # the progress line is only refreshed this often; writing and flushing stdout
+    # for every single query is a syscall on the hot path and nobody can read it anyway
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, bind):
+        super(StandardOutput, self).__init__(bind)
+        self._last_print = 0.0
+
     def print_status(self, status):
         stdout.write(status + '\n')
 
     def print_test_num(self):
+        now = monotonic()
+        if now - self._last_print < StandardOutput.PROGRESS_INTERVAL:
+            return
+        self._last_print = now
         stdout.write('Generated tests: {} | Failed tests: {} | Raised exceptions: {} \r'
                      .format(Stats.tests_num, Stats.fails_num, Stats.exceptions_num))
         stdout.flush()
@@ -19,7 +19,7 @@ def test_database_insert_one(data_three_filter_logicals_company_code):
 
     mongo_handler.save_entry(data_three_filter_logicals_company_code)
 
-    assert mongo_mock.collection.find().count() == 1
+    assert mongo_mock.collection.count_documents({}) == 1
 
 
 def test_database_insert_same(data_three_filter_logicals_company_code):
@@ -29,7 +29,7 @@ def test_database_insert_same(data_three_filter_logicals_company_code):
     mongo_handler.save_entry(data_three_filter_logicals_company_code)
     mongo_handler.save_entry(data_three_filter_logicals_company_code)
 
-    assert mongo_mock.collection.find().count() == 1
+    assert mongo_mock.collection.count_documents({}) == 1
 
 
 def test_database_insert_different(data_three_filter_logicals_company_code, data_single_filter_logical_company_code):
@@ -39,7 +39,35 @@ def test_database_insert_different(data_three_filter_logicals_company_code, data
     mongo_handler.save_entry(data_three_filter_logicals_company_code)
     mongo_handler.save_entry(data_single_filter_logical_company_code)
 
-    assert mongo_mock.collection.find().count() == 2
+    assert mongo_mock.collection.count_documents({}) == 2
+
+
+def test_database_save_entries_bulk(data_three_filter_logicals_company_code, data_single_filter_logical_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entries([data_three_filter_logicals_company_code, data_single_filter_logical_company_code])
+
+    assert mongo_mock.collection.count_documents({}) == 2
+
+
+def test_database_save_entries_same(data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entries([data_three_filter_logicals_company_code])
+    mongo_handler.save_entries([data_three_filter_logicals_company_code])
+
+    assert mongo_mock.collection.count_documents({}) == 1
+
+
+def test_database_save_entries_empty():
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entries([])
+
+    assert mongo_mock.collection.count_documents({}) == 0
 
 
 def test_database_find_existing(data_single_filter_logical_company_code):
@@ -87,7 +115,7 @@ def test_database_delete_worst_entries_zero_from_two(data_single_filter_logical_
 
     mongo_handler.delete_worst_entries(0)
 
-    assert mongo_mock.collection.find().count() == 2
+    assert mongo_mock.collection.count_documents({}) == 2
 
 
 def test_database_delete_worst_entries_one_from_two(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
@@ -97,7 +125,7 @@ def test_database_delete_worst_entries_one_from_two(data_single_filter_logical_c
 
     mongo_handler.delete_worst_entries(1)
 
-    assert mongo_mock.collection.find().count() == 1
+    assert mongo_mock.collection.count_documents({}) == 1
 
 
 def test_database_delete_worst_entries_two_from_two(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
@@ -107,7 +135,7 @@ def test_database_delete_worst_entries_two_from_two(data_single_filter_logical_c
 
     mongo_handler.delete_worst_entries(2)
 
-    assert mongo_mock.collection.find().count() == 0
+    assert mongo_mock.collection.count_documents({}) == 0
 
 
 def test_database_delete_collection(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
@@ -117,7 +145,7 @@ def test_database_delete_collection(data_single_filter_logical_company_code, dat
 
     mongo_handler.delete_collection()
 
-    assert mongo_mock.collection.find().count() == 0
+    assert mongo_mock.collection.count_documents({}) == 0
 
 
 def test_database_total_entries_two(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
@@ -140,6 +168,20 @@ def test_database_total_score_eleven(data_single_filter_logical_company_code, da
     assert total_score == 11
 
 
+def test_database_totals_track_saves_and_deletes(data_single_filter_logical_company_code, data_three_filter_logicals_company_code):
+    mongo_mock = MongoDBMock()
+    mongo_handler = MongoDBHandler(mongo_mock)
+
+    mongo_handler.save_entries([data_single_filter_logical_company_code, data_three_filter_logicals_company_code])
+    entries_after_save = mongo_handler.total_entries()
+    score_after_save = mongo_handler.total_score()
+    mongo_handler.delete_entry(ObjectId("5c61a1295f627d1db904dd39"))
+
+    assert entries_after_save == 2
+    assert score_after_save == 11
+    assert mongo_handler.total_entries() == 1
+
+
 '''
 def test_database_sample_filter_entries_no_exclude(data_single_filter_logical_company_code, data_two_filter_logicals_company_code,
                                                    data_three_filter_logicals_company_code, data_search_output_set):